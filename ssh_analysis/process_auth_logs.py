@@ -1,20 +1,57 @@
 import re
-from requests import get
+import asyncio
+import mmap
+import os
+import shelve
+import threading
+from contextlib import contextmanager
 import requests
 from pathlib import Path
-from typing import Dict, TextIO, Tuple
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import datetime as dt
+import numpy as np
 import pandas as pd
-from io import StringIO
-from google.protobuf.json_format import MessageToJson
 
 from geoip import geolite2
 
-from ssh_analysis.ssh_log_pb2 import SSHLogs, IPLookupData
-from ssh_analysis.utils import safe_attr_get, safe_dict_get, update_progress_bar
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
-PATTERN = r"(\w+\s\d+\s\d+:\d+:\d+)\s.*?(Failed|Accepted)\spassword\sfor\s(invalid\suser\s)?(.+?)\sfrom\s(.+)\sport\s(\d+)"
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+from ssh_analysis.ssh_log_pb2 import SSHLog, SSHLogs, IPLookupData
+from ssh_analysis.utils import update_progress_bar
+
+PATTERN = r"^(\w+\s\d+\s\d+:\d+:\d+)\s.*?(Failed|Accepted)\spassword\sfor\s(invalid\suser\s)?(.+?)\sfrom\s(.+)\sport\s(\d+)"
 MATCH_MAP = {
     "timestamp": 1,
     "validLoginAttempt": 2,
@@ -23,6 +60,17 @@ MATCH_MAP = {
     "ipAddress": 5,
     "port": 6,
 }
+# logs are scanned as raw bytes, so only the captured fields ever need decoding
+_PATTERN_RE = re.compile(PATTERN.encode(), re.MULTILINE)
+
+# every line `PATTERN` matches contains this literal, and most auth log lines don't, so it's used to
+# skip lines with a C-level bytes.find before they ever reach the regex engine
+_PATTERN_LITERAL = b"password"
+
+T = TypeVar("T")
+
+# syslog timestamps don't include the year
+LOG_YEAR = 2022
 
 
 class US_FIPS_Source(Enum):
@@ -54,133 +102,474 @@ def get_data_paths(
     return log_file_path, path_df_us_fips_csv
 
 
+class IPLookupRecord(NamedTuple):
+    """
+    Plain python version of `IPLookupData`, with the same fields and defaults, so the parsing hot
+    path doesn't have to go through protobuf's reflection machinery
+    """
+
+    lat: float = 0.0
+    lon: float = 0.0
+    continent: str = ""
+    country_iso_code: str = ""
+    country_name: str = ""
+    subdivisions: Tuple[str, ...] = ()
+    timezone: str = ""
+    postal_code: str = ""
+    city: str = ""
+
+
+# dataframe column names of the `IPLookupRecord` fields, as named in the protobuf's JSON mapping
+IP_LOOKUP_COLUMNS = (
+    "lat",
+    "lon",
+    "continent",
+    "countryIsoCode",
+    "countryName",
+    "subdivisions",
+    "timezone",
+    "postalCode",
+    "city",
+)
+
+
+@lru_cache(maxsize=1)
+def _maxminddb_reader() -> Optional["maxminddb.Reader"]:
+    """
+    Opens the GeoLite2 database shipped with python-geoip-geolite2 with maxminddb, if it's
+    installed, as its C reader's lookups are much faster than python-geoip's pure python ones
+
+    MODE_AUTO, as maxminddb may be installed without its C extension (e.g. a pure python wheel),
+    in which case it falls back to its own pure python reader rather than raising
+    """
+
+    if maxminddb is None:
+        return None
+
+    import _geoip_geolite2
+
+    db_path = Path(_geoip_geolite2.__file__).with_name(_geoip_geolite2.database_name)
+
+    # if the database can't be opened, python-geoip's reader is still there to fall back on
+    try:
+        return maxminddb.open_database(str(db_path), maxminddb.MODE_AUTO)
+    except (OSError, ValueError, maxminddb.InvalidDatabaseError):
+        return None
+
+
+def _geoip_data(ip_address: str) -> Optional[Dict]:
+    """
+    Given an IP address, return the raw GeoLite2 record for it, or None if there isn't one
+    """
+
+    reader = _maxminddb_reader()
+    if reader is not None:
+        return reader.get(ip_address)
+
+    result = geolite2.lookup(ip_address)
+
+    return result.get_info_dict() if result else None
+
+
+@lru_cache(maxsize=100_000)
+def _lookup_ip_record(ip_address: str) -> IPLookupRecord:
+    """
+    Given an IP address, return GeoIP data
+
+    Memoized, as auth logs are dominated by the same few offending IPs.
+    """
+
+    data = _geoip_data(ip_address)
+
+    if not data:
+        return IPLookupRecord()
+
+    continent = data.get("continent", {}).get("code")
+
+    country = data.get("country", {})
+    country_iso_code = country.get("iso_code")
+    country_name = f"{country.get('names', {}).get('en')} ({country_iso_code})"
+    subdivisions = tuple(
+        div["iso_code"] for div in data.get("subdivisions", ()) if "iso_code" in div
+    )
+
+    city = data.get("city", {}).get("names", {}).get("en")
+    postal_code = data.get("postal", {}).get("code")
+
+    location = data.get("location", {})
+    lat, lon = location.get("latitude"), location.get("longitude")
+    if lat is None or lon is None:
+        lat = lon = None
+
+    timezone = location.get("time_zone")
+
+    fields = dict(
+        lat=lat,
+        lon=lon,
+        continent=continent,
+        country_iso_code=country_iso_code,
+        country_name=country_name,
+        subdivisions=subdivisions,
+        timezone=timezone,
+        postal_code=postal_code,
+        city=city,
+    )
+
+    # leave missing data as the defaults, like protobuf would
+    return IPLookupRecord(**{k: v for k, v in fields.items() if v is not None})
+
+
 def lookup_ip(ip_address: str) -> IPLookupData:
     """
     Given an IP address, return GeoIP data
     """
 
-    result = geolite2.lookup(ip_address)
+    # always build a fresh message so cached results are never shared / mutated across logs
+    return IPLookupData(**_lookup_ip_record(ip_address)._asdict())
+
+
+@lru_cache(maxsize=100_000)
+def _serialized_ip_lookup(ip_address: str) -> bytes:
+    """
+    Serialized `lookup_ip` result. Immutable, so unlike a message it's safe to cache and share, and
+    parsing it into a log's field is much cheaper than building a new message to copy from
+    """
+
+    return lookup_ip(ip_address).SerializeToString()
+
+
+@lru_cache(maxsize=None)
+def _hyperscan_db(
+    regex_pattern: bytes, flags: int = 0
+) -> Optional["hyperscan.Database"]:
+    """
+    Compile `regex_pattern` with the python regex `flags` into a hyperscan DB, returns None if
+    hyperscan isn't installed or can't compile the pattern or honour its flags
+    """
+
+    if hyperscan is None:
+        return None
+
+    # always multiline, so the DB finds every line with a match. Python's flags can only widen
+    # what hyperscan has to find, so any it has no equivalent for rule it out
+    flags &= ~(re.UNICODE | re.MULTILINE)
+    if flags & ~(re.IGNORECASE | re.DOTALL):
+        return None
+
+    hs_flags = hyperscan.HS_FLAG_MULTILINE
+    if flags & re.IGNORECASE:
+        hs_flags |= hyperscan.HS_FLAG_CASELESS
+    if flags & re.DOTALL:
+        hs_flags |= hyperscan.HS_FLAG_DOTALL
+
+    db = hyperscan.Database()
+    try:
+        db.compile(expressions=[regex_pattern], flags=[hs_flags])
+    except hyperscan.error:
+        return None
+
+    return db
+
+
+# python regex flags and their RE2 inline flag equivalents
+_RE2_INLINE_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s"}
+
+
+@lru_cache
+def _re2_pattern(pattern: re.Pattern) -> Optional["re2._Regexp"]:
+    """
+    Compile `pattern` with RE2, whose DFA scans in linear time no matter how the pattern backtracks,
+    returns None if re2 isn't installed or RE2 doesn't support the pattern or its flags
+    """
 
-    ip_lookup_data = IPLookupData()
+    if re2 is None:
+        return None
 
-    if result:
-        data = result.get_info_dict()
+    flags = pattern.flags & ~re.UNICODE
+    if flags & ~sum(_RE2_INLINE_FLAGS):
+        return None
 
-        continent = safe_attr_get(result, "continent")
+    inline_flags = "".join(c for flag, c in _RE2_INLINE_FLAGS.items() if flags & flag)
+    source = pattern.pattern
+    if inline_flags:
+        prefix = f"(?{inline_flags})"
+        source = (prefix.encode() if isinstance(source, bytes) else prefix) + source
 
-        country = safe_dict_get(data, "country")
-        country_iso_code = safe_dict_get(country, "iso_code")
-        country_name = f"{safe_dict_get(country, 'names', 'en')} ({country_iso_code})"
-        subdivisions = [div for div in safe_attr_get(result, "subdivisions")]
+    try:
+        return re2.compile(source)
+    except re2.error:
+        return None
 
-        city = safe_dict_get(data, "city", "names", "en")
-        postal_code = safe_dict_get(data, "postal", "code")
-        location = safe_attr_get(result, "location")
-        if location is not None:
-            lat, lon = location
+
+def _line_bounds(buf: bytes, pos: int) -> Tuple[int, int]:
+    """
+    Returns the (start, end) offsets of the line of `buf` containing `pos`, excluding the newline
+    """
+
+    line_start = buf.rfind(b"\n", 0, pos) + 1
+    line_end = buf.find(b"\n", pos)
+    if line_end == -1:
+        line_end = len(buf)
+
+    return line_start, line_end
+
+
+def _iter_literal_lines(buf: bytes, literal: bytes) -> Iterator[Tuple[int, int]]:
+    """
+    Yields the (start, end) ranges of the lines of `buf` containing `literal`
+    """
+
+    pos = buf.find(literal)
+    while pos != -1:
+        line_start, line_end = _line_bounds(buf, pos)
+        yield line_start, line_end
+
+        pos = buf.find(literal, line_end)
+
+
+def _iter_scans(
+    pattern: re.Pattern, buf: bytes
+) -> Iterator[Tuple[re.Pattern, bytes, int, int]]:
+    """
+    Yields (regex, text, start, end) tuples, where `regex` scanning `text[start:end]` finds the
+    matches of `pattern` in that part of `buf`.
+
+    The default pattern only runs over the lines containing `_PATTERN_LITERAL`, which a plain
+    substring search finds faster than any regex engine. For any other pattern, if hyperscan is
+    available, its DFA finds the lines containing a match so python's (much slower) backtracking
+    regex only needs to run over those lines to extract the capture groups, which hyperscan doesn't
+    report. Matches are assumed not to span lines. Otherwise, it runs over the whole buffer, using
+    RE2 if it's installed.
+    """
+
+    if pattern is _PATTERN_RE:
+        for line_start, line_end in _iter_literal_lines(buf, _PATTERN_LITERAL):
+            yield pattern, buf, line_start, line_end
+        return
+
+    db = _hyperscan_db(pattern.pattern, pattern.flags)
+    if db is None:
+        # RE2 has a much higher per-call overhead than re, so it's only worth it for a single scan
+        # over everything. It also can't read from an mmap, so it scans a copy
+        pattern_re2 = _re2_pattern(pattern)
+        if pattern_re2 is None:
+            yield pattern, buf, 0, len(buf)
         else:
-            lat = lon = None
-
-        timezone = safe_attr_get(result, "timezone")
-
-        ip_lookup_data = IPLookupData(
-            lat=lat,
-            lon=lon,
-            continent=continent,
-            country_iso_code=country_iso_code,
-            country_name=country_name,
-            subdivisions=subdivisions,
-            timezone=timezone,
-            postal_code=postal_code,
-            city=city,
-        )
+            yield pattern_re2, bytes(buf), 0, len(buf)
+        return
 
-    return ip_lookup_data
+    # hyperscan reports every possible match end, so there are several events per matching line
+    match_ends: List[int] = []
 
+    def on_match(id, start, end, flags, context):
+        match_ends.append(end)
 
-def add_log_entry(match, ssh_logs: SSHLogs, match_map: Dict[str, int]) -> SSHLogs:
-    log = ssh_logs.logs.add()
-    datetime_fmt = "%b %d %H:%M:%S"
+    # hyperscan only scans bytes objects, so it needs a copy of an mmap
+    db.scan(bytes(buf), match_event_handler=on_match)
 
-    log.timestamp.FromDatetime(
-        dt.datetime.strptime(match[match_map["timestamp"]], datetime_fmt).replace(
-            year=2022
-        )
+    line_end = -1
+    for end in match_ends:
+        if end <= line_end:
+            continue
+
+        line_start, line_end = _line_bounds(buf, end)
+        yield pattern, buf, line_start, line_end
+
+
+def _iter_matches(pattern: re.Pattern, buf: bytes) -> Iterator[re.Match]:
+    """
+    Yields all matches of `pattern` in `buf`.
+    """
+
+    for regex, text, start, end in _iter_scans(pattern, buf):
+        yield from regex.finditer(text, start, end)
+
+
+def _match_columns(pattern: re.Pattern, buf: bytes) -> List[Tuple[bytes, ...]]:
+    """
+    Returns all of `pattern`'s capture groups in `buf` column-wise, i.e. the i-th tuple holds group
+    i + 1 of every match. Groups that didn't participate in a match are empty instead of None.
+    """
+
+    # findall builds the per-match group tuples in C, which is much cheaper than creating a match
+    # object per log entry and indexing it once per field
+    rows: List[Tuple[bytes, ...]] = []
+    for regex, text, start, end in _iter_scans(pattern, buf):
+        rows.extend(regex.findall(text, start, end))
+
+    if not rows:
+        return [()] * pattern.groups
+
+    return list(zip(*rows))
+
+
+def _decode(field: Union[bytes, str, None]) -> Optional[str]:
+    """
+    Decodes a field captured from the raw log bytes
+    """
+
+    if isinstance(field, bytes):
+        return field.decode("utf-8", "replace")
+
+    return field
+
+
+# syslog's (english) month abbreviations
+_MONTHS = {
+    month: i
+    for i, month in enumerate(
+        "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split(), start=1
     )
-    log.validLoginAttempt = (
-        True if match[match_map["validLoginAttempt"]] == "Accepted" else False
+}
+
+
+@lru_cache(maxsize=8192)
+def _parse_timestamp(timestamp: Union[bytes, str]) -> dt.datetime:
+    """
+    Parses a syslog timestamp like "Mar 27 13:06:56", in `LOG_YEAR`
+
+    Split by hand rather than with the much slower strptime, and memoized, as attacks make lots of
+    attempts each second.
+    """
+
+    month, day, time = _decode(timestamp).split()
+    hour, minute, second = time.split(":")
+
+    return dt.datetime(
+        LOG_YEAR, _MONTHS[month.title()], int(day), int(hour), int(minute), int(second)
     )
-    if match[match_map["usernameIsValid"]] is not None:
-        log.usernameIsValid = False
-    else:
-        log.usernameIsValid = True
 
-    log.user = match[match_map["user"]]
-    log.ipAddress = match[match_map["ipAddress"]]
-    log.port = int(match[match_map["port"]])
 
-    log.ipLookupData.CopyFrom(lookup_ip(ip_address=log.ipAddress))
+# the SSHLog fields filled from a match's groups, in `_fill_log_entry`'s order
+_LOG_ENTRY_FIELDS = (
+    "timestamp",
+    "validLoginAttempt",
+    "usernameIsValid",
+    "user",
+    "ipAddress",
+    "port",
+)
+
+
+def _log_entry_group_indices(match_map: Dict[str, int]) -> Tuple[int, ...]:
+    """
+    `match_map`'s group indices for `_LOG_ENTRY_FIELDS`, so a loop over many matches can look them
+    up once rather than per entry
+    """
+
+    return tuple(match_map[field] for field in _LOG_ENTRY_FIELDS)
+
+
+def _fill_log_entry(log: SSHLog, match: re.Match, group_indices: Tuple[int, ...]):
+    (
+        timestamp_idx,
+        valid_login_idx,
+        username_valid_idx,
+        user_idx,
+        ip_address_idx,
+        port_idx,
+    ) = group_indices
+
+    log.timestamp.FromDatetime(_parse_timestamp(match[timestamp_idx]))
+    log.validLoginAttempt = _decode(match[valid_login_idx]) == "Accepted"
+    # the "invalid user" group only matches for usernames that don't exist
+    log.usernameIsValid = match[username_valid_idx] is None
+
+    log.user = _decode(match[user_idx])
+    log.ipAddress = _decode(match[ip_address_idx])
+    log.port = int(match[port_idx])
+
+    log.ipLookupData.ParseFromString(_serialized_ip_lookup(log.ipAddress))
+
+
+def add_log_entry(match, ssh_logs: SSHLogs, match_map: Dict[str, int]) -> SSHLogs:
+    _fill_log_entry(ssh_logs.logs.add(), match, _log_entry_group_indices(match_map))
 
     return ssh_logs
 
 
-def parse_logs(
-    logfile_path: Path = None,
-    logfile: TextIO = None,
-    regex_pattern: str = PATTERN,
-    match_map: Dict[str, int] = MATCH_MAP,
-    progress_bar=None,
-    status_text=None,
-) -> SSHLogs:
+def _compile_pattern(regex_pattern: Union[str, re.Pattern]) -> re.Pattern:
+    """
+    Returns `regex_pattern` compiled once, as a multiline bytes regex for scanning the whole log.
+    Already compiled patterns are accepted too, and reused as-is when they're already in that form.
+    """
+
+    if regex_pattern == PATTERN:
+        return _PATTERN_RE
+
+    if isinstance(regex_pattern, re.Pattern):
+        source, flags = regex_pattern.pattern, regex_pattern.flags
+        if isinstance(source, bytes) and flags & re.MULTILINE:
+            return regex_pattern
+
+        # str patterns carry the implicit re.UNICODE flag, which isn't allowed for bytes patterns
+        flags &= ~re.UNICODE
+    else:
+        source, flags = regex_pattern, 0
+
+    if isinstance(source, str):
+        source = source.encode()
+
+    return re.compile(source, flags | re.MULTILINE)
+
+
+@contextmanager
+def _read_log(logfile_path: Path = None, logfile: IO = None) -> Iterator[bytes]:
+    """
+    Provides the raw bytes of the log, memory-mapping it when reading from `logfile_path` so the
+    regex engine scans the file without first copying and decoding it. An open `logfile` can be
+    binary or text, though binary saves encoding its contents back to bytes
+
+    The map is closed on exit, so everything reading it (including match objects, which read
+    their groups from it) must be done by then. Left open, the log being truncated / rewritten
+    while it's still mapped would crash the process with a SIGBUS on the next read
+    """
 
     if not ((logfile_path is None) ^ (logfile is None)):
         raise ValueError(
             f"must supply EITHER open logfile ({logfile}) or logfile_path ({logfile_path})"
         )
 
-    def parse(f: TextIO, progress_bar) -> SSHLogs:
-        ssh_logs = SSHLogs()
+    if logfile_path:
+        with open(logfile_path, "rb") as f:
+            # can't mmap an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
 
-        num_lines = sum(1 for line in f)
-        f.seek(0)
-        for i, log_entry in enumerate(f):
-            m = re.match(regex_pattern, log_entry)
-            if m is not None:
-                ssh_logs = add_log_entry(
-                    match=m, ssh_logs=ssh_logs, match_map=match_map
-                )
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-            update_progress_bar(progress_bar, status_text, i, num_lines)
+        try:
+            yield buf
+        finally:
+            buf.close()
+        return
 
-        return ssh_logs
+    contents = logfile.read()
+    if isinstance(contents, str):
+        contents = contents.encode("utf-8")
 
-    if logfile_path:
-        with open(logfile_path) as f:
-            return parse(f, progress_bar)
+    yield contents
 
-    if logfile:
-        return parse(logfile, progress_bar)
 
+# low-cardinality string columns, stored as categoricals
+_CATEGORICAL_COLUMNS = ("continent", "countryIsoCode", "countryName")
 
-def df_from_parsed_logs(ssh_logs: SSHLogs) -> pd.DataFrame:
 
-    json_logs = StringIO()
+def _downcast_dtypes(df: pd.DataFrame) -> pd.DataFrame:
 
-    # IDK why, but the protobuf msg->json includes a ton of extra newlines that will break
-    # reading the df as newline-delimited JSON
-    for log in ssh_logs.logs:
-        json_logs.write(
-            MessageToJson(log, including_default_value_fields=True).replace("\n", "")
-            + "\n"
-        )
+    # ports fit in 16 bits and GeoIP locations are only ~4 decimal places, so halve the memory
+    # (and bandwidth for groupbys / sorts) these columns take up. The port pattern accepts any
+    # digits, so let pandas pick the smallest type that holds them rather than wrapping around
+    df["port"] = pd.to_numeric(df["port"], downcast="unsigned")
+    df[["lat", "lon"]] = df[["lat", "lon"]].astype(np.float32)
+    for col in _CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+
+    return df
 
-    # we want to use read_json because it will properly infer the types (especially date times)
-    df = pd.read_json(json_logs.getvalue(), lines=True)
 
-    # the embedded ipLookipData types is a neted dict per record, so to normalize (flatten),
-    # we normalize and then join on the index
-    df_meta = pd.json_normalize(list(df["ipLookupData"]))
-    df = df.drop("ipLookupData", axis=1).join(df_meta)
+def _add_datetime_breakdown(df: pd.DataFrame) -> pd.DataFrame:
 
     # add datetime breakdown for analytic convenience
     df["date"] = df["timestamp"].dt.date
@@ -190,12 +579,333 @@ def df_from_parsed_logs(ssh_logs: SSHLogs) -> pd.DataFrame:
     return df
 
 
+def _lookup_ips(
+    lookup: Callable[[str], T],
+    ip_addresses: List[str],
+    progress_bar=None,
+    status_text=None,
+) -> List[T]:
+    """
+    Runs the GeoIP `lookup` over all of the (unique) `ip_addresses` concurrently, returning the
+    results in the same order. `lookup` is memoized, so this also warms its cache
+    """
+
+    results = []
+    with ThreadPoolExecutor() as executor:
+        for i, result in enumerate(executor.map(lookup, ip_addresses)):
+            results.append(result)
+
+            update_progress_bar(
+                progress_bar,
+                status_text,
+                i,
+                num_lines=len(ip_addresses),
+                job_name="GeoIP Lookups",
+            )
+
+    return results
+
+
+def parse_logs(
+    logfile_path: Path = None,
+    logfile: IO = None,
+    regex_pattern: Union[str, re.Pattern] = PATTERN,
+    match_map: Dict[str, int] = MATCH_MAP,
+    progress_bar=None,
+    status_text=None,
+) -> SSHLogs:
+
+    pattern = _compile_pattern(regex_pattern)
+    ssh_logs = SSHLogs()
+
+    with _read_log(logfile_path, logfile) as buf:
+        # let the regex engine drive the loop over the whole file rather than matching line-by-line
+        matches = list(_iter_matches(pattern, buf))
+
+        # resolve each unique IP up front, concurrently, so building the log entries only hits the
+        # cache
+        unique_ips = list(
+            dict.fromkeys(_decode(m[match_map["ipAddress"]]) for m in matches)
+        )
+        _lookup_ips(_serialized_ip_lookup, unique_ips, progress_bar, status_text)
+
+        add_log = ssh_logs.logs.add
+        group_indices = _log_entry_group_indices(match_map)
+        for i, m in enumerate(matches):
+            _fill_log_entry(add_log(), m, group_indices)
+
+            update_progress_bar(progress_bar, status_text, i, len(matches))
+
+    return ssh_logs
+
+
+def df_from_parsed_logs(ssh_logs: SSHLogs) -> pd.DataFrame:
+
+    # read the fields straight off of the messages a column at a time, rather than building a dict
+    # per log entry (or round-tripping them through MessageToDict's JSON mapping)
+    logs = ssh_logs.logs
+    df = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(
+                np.fromiter(
+                    (log.timestamp.ToNanoseconds() for log in logs),
+                    dtype=np.int64,
+                    count=len(logs),
+                ),
+                utc=True,
+            ),
+            "validLoginAttempt": [log.validLoginAttempt for log in logs],
+            "usernameIsValid": [log.usernameIsValid for log in logs],
+            "user": [log.user for log in logs],
+            "ipAddress": [log.ipAddress for log in logs],
+            "port": np.fromiter(
+                (log.port for log in logs), dtype=np.int64, count=len(logs)
+            ),
+        }
+    )
+
+    # the ipLookupData is a function of the IP, so only flatten it out of the first log entry of
+    # each unique IP, and broadcast it back to the rest with a single take
+    ip_codes, unique_ips = pd.factorize(df["ipAddress"])
+    _, first_logs = np.unique(ip_codes, return_index=True)
+    ip_data = [logs[int(i)].ipLookupData for i in first_logs]
+
+    df_ips = pd.DataFrame(
+        {
+            "lat": [data.lat for data in ip_data],
+            "lon": [data.lon for data in ip_data],
+            "continent": [data.continent for data in ip_data],
+            "countryIsoCode": [data.country_iso_code for data in ip_data],
+            "countryName": [data.country_name for data in ip_data],
+            "subdivisions": [list(data.subdivisions) for data in ip_data],
+            "timezone": [data.timezone for data in ip_data],
+            "postalCode": [data.postal_code for data in ip_data],
+            "city": [data.city for data in ip_data],
+        }
+    )
+    df = df.join(df_ips.take(ip_codes).reset_index(drop=True))
+
+    return _add_datetime_breakdown(_downcast_dtypes(df))
+
+
+def parse_logs_to_df(
+    logfile_path: Path = None,
+    logfile: IO = None,
+    regex_pattern: Union[str, re.Pattern] = PATTERN,
+    match_map: Dict[str, int] = MATCH_MAP,
+    progress_bar=None,
+    status_text=None,
+) -> pd.DataFrame:
+    """
+    Parses logs straight into the dataframe `df_from_parsed_logs(parse_logs(...))` would give,
+    without building (and then JSON round-tripping) a protobuf message per log entry.
+    """
+
+    pattern = _compile_pattern(regex_pattern)
+    with _read_log(logfile_path, logfile) as buf:
+        columns = _match_columns(pattern, buf)
+    timestamps, actions, invalid_users, users, ip_addresses, ports = (
+        columns[match_map[field] - 1]
+        for field in (
+            "timestamp",
+            "validLoginAttempt",
+            "usernameIsValid",
+            "user",
+            "ipAddress",
+            "port",
+        )
+    )
+
+    # factorize the IPs, so each unique IP is only decoded and looked up once, and the results are
+    # broadcast back to the log entries with a single take
+    ip_codes, unique_ips = pd.factorize(pd.Series(ip_addresses, dtype=object))
+    unique_ips = [_decode(ip_address) for ip_address in unique_ips]
+
+    ip_records = _lookup_ips(_lookup_ip_record, unique_ips, progress_bar, status_text)
+
+    df_ips = pd.DataFrame(ip_records, columns=IP_LOOKUP_COLUMNS)
+    df_ips["subdivisions"] = df_ips["subdivisions"].map(list)
+    df_ips.insert(0, "ipAddress", unique_ips)
+
+    # the other captured fields are still raw bytes, so decode the text columns in bulk
+    df = pd.DataFrame(
+        {
+            "timestamp": pd.Series(timestamps, dtype=object).str.decode("utf-8"),
+            "validLoginAttempt": pd.Series(actions, dtype=object) == b"Accepted",
+            "usernameIsValid": pd.Series(invalid_users, dtype=object) == b"",
+            "user": pd.Series(users, dtype=object).str.decode("utf-8", "replace"),
+            "port": np.fromiter(map(int, ports), dtype=np.int64, count=len(ports)),
+        }
+    )
+
+    # parse all timestamps in one go rather than calling strptime per log entry
+    df["timestamp"] = pd.to_datetime(
+        f"{LOG_YEAR} " + df["timestamp"], format="%Y %b %d %H:%M:%S", utc=True
+    )
+
+    df_meta = df_ips.take(ip_codes).reset_index(drop=True)
+    df = df.join(df_meta)
+
+    # same column order as `df_from_parsed_logs`, which follows the SSHLog message's fields
+    df.insert(df.columns.get_loc("port"), "ipAddress", df.pop("ipAddress"))
+
+    return _add_datetime_breakdown(_downcast_dtypes(df))
+
+
+FCC_API_URL = "https://geo.fcc.gov/api/census/area?lat={lat}&lon={lon}&format=json"
+FCC_API_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Referer": "https://cssspritegenerator.com",
+    "Accept-Charset": "ISO-8859-1,utf-8;q=0.7,*;q=0.3",
+    "Accept-Encoding": "none",
+    "Accept-Language": "en-US,en;q=0.8",
+    "Connection": "keep-alive",
+}
+FIPS_COLUMNS = ("county_fips", "county_name", "state_fips", "state_code", "state_name")
+FIPS_CACHE_PATH = Path.home() / ".cache" / "ssh_analysis" / "fcc_fips"
+# dbm doesn't support concurrent writers, and every Streamlit session is a thread in the same
+# process, so all access to the FIPS cache shelf goes through this lock
+_FIPS_CACHE_LOCK = threading.Lock()
+
+# max number of concurrent requests to the FCC API
+_FCC_API_MAX_CONNECTIONS = 20
+
+# called with each (lat, lon) and its FIPS data as soon as the FCC API returns it
+FIPSCallback = Callable[[Tuple[str, str], Tuple[str, ...]], None]
+
+
+def _fips_cache_key(lat: str, lon: str) -> str:
+    return f"{lat},{lon}"
+
+
+def _fips_from_response(response: Dict) -> Tuple[str, ...]:
+    data = response["results"][0]
+    return tuple(data[col] for col in FIPS_COLUMNS)
+
+
+async def _fetch_fips_async(
+    coords: List[Tuple[str, str]],
+    progress_bar=None,
+    status_text=None,
+    on_fetched: Optional[FIPSCallback] = None,
+) -> List[Tuple[str, ...]]:
+
+    connector = aiohttp.TCPConnector(limit=_FCC_API_MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(
+        connector=connector, headers=FCC_API_HEADERS
+    ) as session:
+
+        async def fetch(i: int, lat: str, lon: str):
+            async with session.get(FCC_API_URL.format(lat=lat, lon=lon)) as r:
+                # the FCC API doesn't always set a JSON content type
+                return i, _fips_from_response(await r.json(content_type=None))
+
+        results = [None] * len(coords)
+        tasks = [fetch(i, lat, lon) for i, (lat, lon) in enumerate(coords)]
+        for num_done, task in enumerate(asyncio.as_completed(tasks)):
+            i, fips = await task
+            results[i] = fips
+            if on_fetched is not None:
+                on_fetched(coords[i], fips)
+
+            update_progress_bar(
+                progress_bar,
+                status_text,
+                num_done,
+                job_name="FCC API Lookups",
+                num_lines=len(coords),
+            )
+
+        return results
+
+
+def _fetch_fips_threaded(
+    coords: List[Tuple[str, str]],
+    progress_bar=None,
+    status_text=None,
+    on_fetched: Optional[FIPSCallback] = None,
+) -> List[Tuple[str, ...]]:
+
+    # share one keep-alive connection pool across the worker threads, rather than paying for a new
+    # TCP / TLS handshake on every request
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=_FCC_API_MAX_CONNECTIONS)
+        session.mount("https://", adapter)
+        session.headers.update(FCC_API_HEADERS)
+
+        def fetch(coord: Tuple[str, str]) -> Tuple[str, ...]:
+            lat, lon = coord
+            return _fips_from_response(
+                session.get(FCC_API_URL.format(lat=lat, lon=lon)).json()
+            )
+
+        results = []
+        with ThreadPoolExecutor(max_workers=_FCC_API_MAX_CONNECTIONS) as executor:
+            for i, fips in enumerate(executor.map(fetch, coords)):
+                results.append(fips)
+                if on_fetched is not None:
+                    on_fetched(coords[i], fips)
+
+                update_progress_bar(
+                    progress_bar,
+                    status_text,
+                    i,
+                    job_name="FCC API Lookups",
+                    num_lines=len(coords),
+                )
+
+        return results
+
+
+def _fetch_fips(
+    coords: List[Tuple[str, str]],
+    progress_bar=None,
+    status_text=None,
+    on_fetched: Optional[FIPSCallback] = None,
+) -> List[Tuple[str, ...]]:
+    """
+    Looks up the FIPS data of each (lat, lon) in `coords` with the FCC API, concurrently. Uses
+    `aiohttp` if it's installed, otherwise a thread pool of `requests`. `on_fetched` is called
+    with each result as it comes in, one at a time
+    """
+
+    if not coords:
+        return []
+
+    if aiohttp is None:
+        return _fetch_fips_threaded(
+            coords,
+            progress_bar=progress_bar,
+            status_text=status_text,
+            on_fetched=on_fetched,
+        )
+
+    coro = _fetch_fips_async(
+        coords,
+        progress_bar=progress_bar,
+        status_text=status_text,
+        on_fetched=on_fetched,
+    )
+
+    # asyncio.run can't be nested in an already running event loop (e.g. in jupyter), so give
+    # the requests their own loop in a separate thread in that case
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
 def get_US_fips_data_from_lat_lon(
     df: pd.DataFrame = None,
     csv_path: Path = None,
     US_fips_data_source: US_FIPS_Source = US_FIPS_Source.FCC_API,
     progress_bar=None,
     status_text=None,
+    fips_cache_path: Path = FIPS_CACHE_PATH,
 ) -> pd.DataFrame:
 
     if US_fips_data_source == US_FIPS_Source.CSV:
@@ -214,51 +924,50 @@ def get_US_fips_data_from_lat_lon(
     if df is None:
         raise ValueError("df must not be None if loading from FCC source")
 
-    BASE_URL = "https://geo.fcc.gov/api/census/area?lat={lat}&lon={lon}&format=json"
+    df_us = df[df["countryIsoCode"] == "US"].copy().reset_index()
 
-    def get_fips(row, num_rows, progress_bar=None, status_text=None):
-        lat = row["lat"]
-        lon = row["lon"]
+    # many log entries come from the same IP (and so the same lat/lon), so only look up each
+    # location once, and only if it isn't in the on-disk cache from a previous run
+    df_fips = df_us[["lat", "lon"]].drop_duplicates().reset_index(drop=True)
+    # format the (float32) coordinates with numpy, which gives their shortest repr rather than the
+    # noisy digits of their float64 conversion
+    coords = list(
+        zip(
+            df_fips["lat"].to_numpy().astype(str),
+            df_fips["lon"].to_numpy().astype(str),
+        )
+    )
 
-        hdr = {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Referer": "https://cssspritegenerator.com",
-            "Accept-Charset": "ISO-8859-1,utf-8;q=0.7,*;q=0.3",
-            "Accept-Encoding": "none",
-            "Accept-Language": "en-US,en;q=0.8",
-            "Connection": "keep-alive",
+    fips_cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with _FIPS_CACHE_LOCK, shelve.open(str(fips_cache_path)) as fips_cache:
+        fips_by_coord = {
+            coord: fips_cache[_fips_cache_key(*coord)]
+            for coord in coords
+            if _fips_cache_key(*coord) in fips_cache
         }
+    missing_coords = [coord for coord in coords if coord not in fips_by_coord]
+
+    # cache each result as soon as it arrives, so an interrupted run picks up where it left off.
+    # The shelf is only held open (under the lock) for the write itself, so other sessions
+    # geocoding at the same time never have it open for writing alongside us
+    def cache_fips(coord: Tuple[str, str], fips: Tuple[str, ...]):
+        fips_by_coord[coord] = fips
+        with _FIPS_CACHE_LOCK, shelve.open(str(fips_cache_path)) as fips_cache:
+            fips_cache[_fips_cache_key(*coord)] = fips
+
+    _fetch_fips(
+        missing_coords,
+        progress_bar=progress_bar,
+        status_text=status_text,
+        on_fetched=cache_fips,
+    )
 
-        url = BASE_URL.format(lat=lat, lon=lon)
-        d = get(url, headers=hdr)
-
-        data = d.json()["results"][0]
-        row["county_fips"] = data["county_fips"]
-        row["county_name"] = data["county_name"]
-        row["state_fips"] = data["state_fips"]
-        row["state_code"] = data["state_code"]
-        row["state_name"] = data["state_name"]
-
-        update_progress_bar(
-            progress_bar,
-            status_text,
-            row.name,
-            job_name="FCC API Lookups",
-            num_lines=num_rows,
+    df_fips = df_fips.join(
+        pd.DataFrame(
+            [fips_by_coord[coord] for coord in coords],
+            columns=FIPS_COLUMNS,
         )
-
-        return row
-
-    df_us = df[df["countryIsoCode"] == "US"].copy().reset_index()
-    df_us = df_us.apply(
-        lambda row: get_fips(
-            row,
-            len(df_us),
-            progress_bar=progress_bar,
-            status_text=status_text,
-        ),
-        axis=1,
     )
 
-    return df_us
+    # broadcast the per-location results back to every row with a single join
+    return df_us.merge(df_fips, on=["lat", "lon"], how="left")
@@ -1,28 +1,4 @@
 from math import ceil
-import numpy as np
-
-
-def safe_attr_get(obj, attr):
-    try:
-        return getattr(obj, attr)
-    except AttributeError:
-        return None
-
-
-def safe_dict_get(d, *keys, type=None):
-    for key in keys:
-        try:
-            if d is not None:
-                d = d[key]
-            else:
-                return None
-        except KeyError:
-            return None
-
-    if type:
-        return type(d)
-    else:
-        return d
 
 
 def update_progress_bar(
@@ -36,11 +12,13 @@ def update_progress_bar(
     if (progress_bar is None) or (status_text is None):
         return
 
-    percent_complete = ceil(i / num_lines * 100)
-    update_at_these_indices = list(
-        np.floor(np.linspace(0, num_lines, int(100 / update_every_x_percent)))
-    )
+    # only update on the first index of each `update_every_x_percent` step, which is O(1) to check
+    # rather than rebuilding and searching the list of update indices on every call
+    num_steps = 100 / update_every_x_percent
+    step = int(i / num_lines * num_steps)
+    if i > 0 and step == int((i - 1) / num_lines * num_steps):
+        return
 
-    if i in update_at_these_indices:
-        progress_bar.progress(percent_complete)
-        status_text.text(f"{job_name}: {percent_complete:.0f}% Complete")
+    percent_complete = ceil(i / num_lines * 100)
+    progress_bar.progress(percent_complete)
+    status_text.text(f"{job_name}: {percent_complete:.0f}% Complete")
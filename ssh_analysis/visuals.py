@@ -1,22 +1,54 @@
 import json
+from functools import lru_cache
+from pathlib import Path
 from urllib.request import urlopen
 
 import numpy as np
-from numpy import float64
 import pandas as pd
 
 import iso3166
 import plotly.graph_objs as go
 import plotly.express as px
 import pydeck as pdk
-import altair as alt
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Plotly cannot handle two-character country abbreviations, so we need the three-character ones
+_ISO2_TO_ISO3 = {country.alpha2: country.alpha3 for country in iso3166.countries}
+
+COUNTIES_GEOJSON_URL = "https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json"
+COUNTIES_GEOJSON_CACHE_PATH = (
+    Path.home() / ".cache" / "ssh_analysis" / "geojson-counties-fips.json"
+)
+
+
+@lru_cache(maxsize=1)
+def _get_counties_geojson(cache_path: Path = COUNTIES_GEOJSON_CACHE_PATH) -> dict:
+
+    # ~3MB of geojson, so only download it once ever and only parse it once per process
+    if cache_path.exists():
+        data = cache_path.read_bytes()
+    else:
+        with urlopen(COUNTIES_GEOJSON_URL) as response:
+            data = response.read()
+
+        # write to a temp file first, so an interrupted write never leaves a truncated cache behind
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(cache_path)
+
+    return orjson.loads(data) if orjson is not None else json.loads(data)
 
 
 def make_altair_bar_chart(
     df: pd.DataFrame, categories: str, disable_max_rows_error: bool = False
 ):
+    # imported here so only the pages plotting with altair pay for importing it
+    import altair as alt
 
     # have to make date a string so it is serialized as JSON correctly
     df_plot = df.copy()
@@ -46,30 +78,24 @@ def make_altair_bar_chart(
 
 
 def make_ridge_plot(df: pd.DataFrame):
+    # imported here so only the pages plotting with seaborn pay for importing it
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     sns.set_style("ticks")
     sns.set_theme(style="white", rc={"axes.facecolor": (0, 0, 0, 0)})
 
-    groups = [
-        "date",
-        "hour",
-        "ipAddress",
-        "validLoginAttempt",
-        "countryName",
-        "user",
-        "usernameIsValid",
-    ]
-    df_plot = df.copy()
-    df_grouped = df.groupby(groups).size().to_frame("login attempts").reset_index()
-    df_g = (
-        df_grouped.groupby(["date", "hour"])
-        .sum()
-        .reset_index()[["hour", "login attempts"]]
+    # per-(date, hour) login attempt counts, as a dense day x hour histogram instead of a hash groupby
+    date_codes, dates = pd.factorize(df["date"])
+    counts = np.bincount(
+        date_codes * 24 + df["hour"].to_numpy(), minlength=len(dates) * 24
+    ).reshape(len(dates), 24)
+
+    # walking the transposed histogram gives the (date, hour) pairs with attempts already sorted by hour
+    hours, date_idx = np.nonzero(counts.T)
+    df_g = pd.DataFrame(
+        {"hour": hours.astype(str), "login attempts": counts[date_idx, hours]}
     )
-    df_g["login attempts"] = df_g["login attempts"].astype(float64)
-    df_g["hour"] = df_g["hour"].astype(int)
-    df_g.sort_values(by=["hour"], ascending=True, inplace=True)
-    df_g["hour"] = df_g["hour"].astype(str)
 
     # Initialize the FacetGrid object
     pal = sns.cubehelix_palette(24, rot=-0.25, light=0.7)
@@ -134,13 +160,14 @@ def make_choropleth_plot(
 ):
     """uses `Plotly` to create a choropleth map of the origin of the nefarious incidents"""
 
-    df_failed_logins = df[~df["validLoginAttempt"]]
-    df_clean = df_failed_logins.drop(
-        df_failed_logins[df_failed_logins["countryIsoCode"] == ""].index
-    )
+    # failed logins with a known country, in one pass
+    failed_with_country = ~df["validLoginAttempt"] & df["countryIsoCode"].ne("")
 
+    # observed=True, as the country columns may be categoricals (value_counts would also count
+    # every unobserved code x name combination, as zeros)
     df_grouped = (
-        df_clean.groupby(["countryIsoCode", "countryName"])
+        df.loc[failed_with_country, ["countryIsoCode", "countryName"]]
+        .groupby(["countryIsoCode", "countryName"], observed=True)
         .size()
         .to_frame("size")
         .reset_index()
@@ -148,8 +175,8 @@ def make_choropleth_plot(
 
     # Convert from two-character abbreviations to three-character
     # abbreviations because `Plotly` cannot handle them.
-    df_grouped["countryIsoCode_three_letter"] = df_grouped["countryIsoCode"].apply(
-        lambda code: iso3166.countries.get(code).alpha3
+    df_grouped["countryIsoCode_three_letter"] = df_grouped["countryIsoCode"].map(
+        _ISO2_TO_ISO3
     )
 
     data = [
@@ -192,6 +219,7 @@ def make_choropleth_plot(
 
 PYDECK_LAT_LON_LAYER_KWARGS = {
     "HexagonLayer": {
+        "radius": 1000,  # Radius is given in meters
         "elevation_scale": 50,
         "pickable": True,
         "elevation_range": [0, 20000],
@@ -201,20 +229,71 @@ PYDECK_LAT_LON_LAYER_KWARGS = {
     "ScatterplotLayer": {
         "get_radius": 50000,  # Radius is given in meters
         "get_fill_color": [180, 0, 200, 140],  # Set an RGBA value for fill
+        "radius_min_pixels": 0,
         "pickable": True,
     },
 }
 
 
-def make_pydeck_chart(
-    df_with_lat_lon: pd.DataFrame,
+def make_pydeck_layer_data(
+    df_with_lat_lon: pd.DataFrame, viz_type: str = "HexagonLayer"
+) -> pd.DataFrame:
+    """
+    the (lat, lon[, count]) rows a `viz_type` pydeck layer of `df_with_lat_lon` is built from
+    """
+
+    df_lat_lon = df_with_lat_lon[["lat", "lon"]].dropna()
+    float32_coords = (df_lat_lon.dtypes == np.float32).any()
+
+    # the hexagon layer only needs how many attempts came from each location, so collapse
+    # repeated locations into weighted points rather than shipping every row to the browser
+    if viz_type == "HexagonLayer":
+        df_lat_lon = (
+            df_lat_lon.groupby(["lat", "lon"], sort=False)
+            .size()
+            .to_frame("count")
+            .reset_index()
+        )
+
+    # float32 coordinates get widened to float64 (by the groupby, or on their way to JSON), which
+    # pads them out with noise digits (-6.175 -> -6.175000190734863), so hand pydeck the float64s
+    # that float32 prints as instead
+    if float32_coords:
+        df_lat_lon = df_lat_lon.assign(
+            **{
+                col: df_lat_lon[col]
+                .to_numpy(dtype=np.float32)
+                .astype(str)
+                .astype(np.float64)
+                for col in ("lat", "lon")
+            }
+        )
+
+    return df_lat_lon
+
+
+def make_pydeck_chart_from_layer_data(
+    layer_data: pd.DataFrame,
     viz_type: str = "HexagonLayer",
     layer_kwargs: dict = PYDECK_LAT_LON_LAYER_KWARGS["HexagonLayer"],
 ):
+    """
+    builds the pydeck chart from `make_pydeck_layer_data`'s output, so the data can be prepared
+    (and cached) separately from the deck, which doesn't survive pickling
+    """
+
+    if viz_type == "HexagonLayer":
+        layer_kwargs = {
+            "get_elevation_weight": "count",
+            "elevation_aggregation": pdk.types.String("SUM"),
+            "get_color_weight": "count",
+            "color_aggregation": pdk.types.String("SUM"),
+            **layer_kwargs,
+        }
 
     layer = pdk.Layer(
         viz_type,  # `type` positional argument is here
-        df_with_lat_lon[["lat", "lon"]].dropna(),
+        layer_data,
         get_position=["lon", "lat"],
         auto_highlight=True,
         **layer_kwargs,
@@ -235,11 +314,21 @@ def make_pydeck_chart(
     return pdk.Deck(layers=[layer], initial_view_state=view_state)
 
 
+def make_pydeck_chart(
+    df_with_lat_lon: pd.DataFrame,
+    viz_type: str = "HexagonLayer",
+    layer_kwargs: dict = PYDECK_LAT_LON_LAYER_KWARGS["HexagonLayer"],
+):
+
+    return make_pydeck_chart_from_layer_data(
+        make_pydeck_layer_data(df_with_lat_lon, viz_type),
+        viz_type=viz_type,
+        layer_kwargs=layer_kwargs,
+    )
+
+
 def make_US_fips_choropleth_plot(df_us: pd.DataFrame, by_county: bool = True):
-    with urlopen(
-        "https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json"
-    ) as response:
-        counties = json.load(response)
+    counties = _get_counties_geojson()
 
     # by county
     if by_county:
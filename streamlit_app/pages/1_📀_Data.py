@@ -1,6 +1,6 @@
 from enum import Enum
-from io import StringIO
-from typing import TextIO
+from io import BytesIO
+from typing import IO
 from matplotlib import use
 import streamlit as st
 import pandas as pd
@@ -13,8 +13,7 @@ from ssh_analysis.process_auth_logs import (
     get_data_paths,
     get_US_fips_data_from_lat_lon,
     lookup_ip,
-    parse_logs,
-    df_from_parsed_logs,
+    parse_logs_to_df,
 )
 
 
@@ -82,12 +81,12 @@ class DS(str, Enum):
 
 
 @st.experimental_memo(suppress_st_warning=True)
-def get_data(logfile: TextIO, log_file_path: Path):
+def get_data(logfile: IO, log_file_path: Path):
 
     progress_bar = st.sidebar.progress(0)
     status_text = st.sidebar.empty()
 
-    ssh_logs = parse_logs(
+    data = parse_logs_to_df(
         logfile=logfile,
         logfile_path=log_file_path,
         progress_bar=progress_bar,
@@ -96,7 +95,7 @@ def get_data(logfile: TextIO, log_file_path: Path):
     progress_bar.empty()
     status_text.text(f"Done processing. Logs Analyzed")
 
-    return df_from_parsed_logs(ssh_logs)
+    return data
 
 
 @st.experimental_memo(suppress_st_warning=True)
@@ -140,9 +139,9 @@ if DS(data_source) is DS.UPLOAD:
         accept_multiple_files=False,
     )
 
-    # need to convert to StringIO so it works like an opened file elsewhere
+    # the parser works on raw bytes, so hand it a fresh binary file rather than decoding the upload
     if logfile:
-        logfile = StringIO(logfile.getvalue().decode("utf-8"))
+        logfile = BytesIO(logfile.getvalue())
 
     # still need to load df_us path so you can save processed FIPS codes later
     _, path_df_us_fips_csv = get_data_paths(
@@ -1,12 +1,14 @@
-from uuid import uuid4
+from typing import Optional, Tuple
+import pandas as pd
 import streamlit as st
 from ssh_analysis.visuals import (
     make_choropleth_plot,
-    make_pydeck_chart,
+    make_pydeck_chart_from_layer_data,
+    make_pydeck_layer_data,
     make_US_fips_choropleth_plot,
     PYDECK_LAT_LON_LAYER_KWARGS,
 )
-from streamlit_app.utils import run_data_app, date_slider_filter_data, dict_input
+from streamlit_app.utils import run_data_app, date_slider_filter_data
 
 st.set_page_config(page_title="Geospatial Visualizations", page_icon="🌎", layout="wide")
 
@@ -18,108 +20,270 @@ st.markdown(
 )
 
 
-def data_app(data):
+PROJECTIONS_2D = (
+    "equirectangular",
+    "mercator",
+    "orthographic",
+    "natural earth",
+    "kavrayskiy7",
+    "miller",
+    "robinson",
+    "eckert4",
+    "azimuthal equal area",
+    "azimuthal equidistant",
+    "conic equal area",
+    "conic conformal",
+    "conic equidistant",
+    "gnomonic",
+    "stereographic",
+    "mollweide",
+    "hammer",
+    "transverse mercator",
+    "albers usa",
+    "winkel tripel",
+    "aitoff",
+    "sinusoidal",
+)
+
+
+# cache figures for a while, but don't let them pile up in memory
+FIGURE_CACHE_TTL_SECONDS = 15 * 60
+FIGURE_CACHE_MAX_ENTRIES = 16
+
+
+def _query_param_index(name: str, options: Tuple, default_index: int) -> int:
+    """
+    index of the option given by the page URL's `name` query parameter, so that a bookmarked /
+    shared link opens with the same controls (and so hits the same cached figures)
+    """
+
+    value = st.experimental_get_query_params().get(name, [None])[0]
+
+    return options.index(value) if value in options else default_index
+
+
+def deck_layer_options(viz_type: str) -> dict:
+    """
+    one typed widget per pydeck layer option, seeded from the layer's defaults - cheaper to
+    render and validate than a free-form json editor, and can't be edited into invalid kwargs
+    """
+
+    layer_kwargs = {}
+    for name, default in PYDECK_LAT_LON_LAYER_KWARGS[viz_type].items():
+        key = f"deck-opts-{viz_type}-{name}"
+
+        if isinstance(default, bool):
+            layer_kwargs[name] = st.checkbox(name, value=default, key=key)
+
+        elif isinstance(default, (int, float)):
+            layer_kwargs[name] = st.number_input(name, value=default, key=key)
+
+        # RGBA colors
+        elif name.endswith("color"):
+            r, g, b, a = default
+            rgb = st.color_picker(name, value=f"#{r:02x}{g:02x}{b:02x}", key=key)
+            alpha = st.number_input(
+                f"{name} alpha", min_value=0, max_value=255, value=a, key=f"{key}-alpha"
+            )
+            layer_kwargs[name] = [int(rgb[i : i + 2], 16) for i in (1, 3, 5)] + [alpha]
+
+        # [low, high] ranges
+        else:
+            low, high = default
+            layer_kwargs[name] = [
+                st.number_input(f"{name} min", value=low, key=f"{key}-min"),
+                st.number_input(f"{name} max", value=high, key=f"{key}-max"),
+            ]
+
+    return layer_kwargs
+
+
+# the columns the global plots are built from
+_DF_KEY_COLUMNS = [
+    "timestamp",
+    "validLoginAttempt",
+    "ipAddress",
+    "lat",
+    "lon",
+    "countryIsoCode",
+]
+
+
+def _df_key(df: pd.DataFrame) -> Tuple:
+    """
+    Cheap stand-in for hashing a whole (time-sorted) dataframe, so the cached plotting functions
+    below can skip hashing it: its size and time span, plus a hash of the columns the plots use
+    (~20ms for 75k rows). The memo caches are shared by every session, so the content hash keeps
+    different logs with the same size and time span, or the same logs with different GeoIP
+    data, from getting each other's figures
+    """
+
+    if df.empty:
+        return (0,)
+
+    return (
+        len(df),
+        str(df["timestamp"].iloc[0]),
+        str(df["timestamp"].iloc[-1]),
+        int(pd.util.hash_pandas_object(df[_DF_KEY_COLUMNS], index=False).sum()),
+    )
+
+
+def _US_fips_df_key(df_us: pd.DataFrame) -> Tuple:
+    """
+    fingerprint of the columns the FIPS choropleth aggregates - the US subset is small enough
+    to hash in full (a few ms), and unlike the time span it changes if the FIPS codes do
+    """
+
+    return len(df_us), int(
+        pd.util.hash_pandas_object(
+            df_us[["state_code", "county_fips"]], index=False
+        ).sum()
+    )
+
+
+@st.experimental_memo(
+    ttl=FIGURE_CACHE_TTL_SECONDS, max_entries=FIGURE_CACHE_MAX_ENTRIES
+)
+def cached_choropleth_plot(
+    _df: pd.DataFrame, df_key: Tuple, projection_type: str, width: int, height: int
+):
+    return make_choropleth_plot(
+        df=_df, projection_type=projection_type, width=width, height=height
+    )
+
+
+@st.experimental_memo(
+    ttl=FIGURE_CACHE_TTL_SECONDS, max_entries=FIGURE_CACHE_MAX_ENTRIES
+)
+def cached_pydeck_layer_data(
+    _df_with_lat_lon: pd.DataFrame, df_key: Tuple, viz_type: str
+) -> pd.DataFrame:
+    # only the layer data is memoized, as memo pickles its results and a pickled pdk.Deck (with
+    # its ipywidgets DeckGLWidget) fails to unpickle - building the deck from it is cheap anyway
+    return make_pydeck_layer_data(df_with_lat_lon=_df_with_lat_lon, viz_type=viz_type)
+
+
+@st.experimental_memo(
+    ttl=FIGURE_CACHE_TTL_SECONDS, max_entries=FIGURE_CACHE_MAX_ENTRIES
+)
+def cached_US_fips_choropleth_plot(
+    _df_us: pd.DataFrame, df_key: Tuple, by_county: bool
+):
+    return make_US_fips_choropleth_plot(df_us=_df_us, by_county=by_county)
+
+
+def global_choropleth(data: pd.DataFrame) -> str:
 
     with st.expander("Global Choropleth"):
-        projections_2d = [
-            "equirectangular",
-            "mercator",
-            "orthographic",
-            "natural earth",
-            "kavrayskiy7",
-            "miller",
-            "robinson",
-            "eckert4",
-            "azimuthal equal area",
-            "azimuthal equidistant",
-            "conic equal area",
-            "conic conformal",
-            "conic equidistant",
-            "gnomonic",
-            "stereographic",
-            "mollweide",
-            "hammer",
-            "transverse mercator",
-            "albers usa",
-            "winkel tripel",
-            "aitoff",
-            "sinusoidal",
-        ]
-
-        col1, col2 = st.columns((1, 2), gap="large")  # To make it narrower
-        projection = col1.selectbox(
-            "Which map projection would you like to use?",
-            projections_2d,
-            index=2,
-        )
-        filtered_data = date_slider_filter_data(
-            col2, data, streamlit_widget_key="slider-1"
-        )
+        # batch the control changes into a single rerun on submit, rather than one per
+        # slider tick
+        with st.form(key="geo-form-1"):
+            col1, col2 = st.columns((1, 2), gap="large")  # To make it narrower
+            projection = col1.selectbox(
+                "Which map projection would you like to use?",
+                PROJECTIONS_2D,
+                index=_query_param_index("projection", PROJECTIONS_2D, 2),
+                key="geo-projection",
+            )
+            filtered_data = date_slider_filter_data(
+                col2, data, streamlit_widget_key="slider-1"
+            )
+            st.form_submit_button("Update plot")
 
         st.plotly_chart(
-            make_choropleth_plot(
-                df=filtered_data, projection_type=projection, width=2000, height=800
+            cached_choropleth_plot(
+                filtered_data,
+                _df_key(filtered_data),
+                projection_type=projection,
+                width=2000,
+                height=800,
             ),
             use_container_width=True,
         )
 
-    with st.expander("PyDeck Lat/Lon Viz"):
-        col4, col5 = st.columns((1, 3), gap="large")
+    return projection
 
-        filtered_data = date_slider_filter_data(
-            col5, data, streamlit_widget_key="slider-2"
-        )
-        viz_type = col5.selectbox(
-            "Deck Layer",
-            ["HexagonLayer", "ScatterplotLayer"],
-            index=0,
-        )
 
-        # json input widget usefully remembers state between runs so you can keep editing, but we don't want that
-        if ("deck_options_key" in st.session_state) and (
-            viz_type in st.session_state.deck_options_key
-        ):
-            pass
-        else:
-            st.session_state.deck_options_key = {}
-            st.session_state.deck_options_key[viz_type] = uuid4()
-
-        with col4:
-            layer_kwargs = dict_input(
-                "Layer Options",
-                value=PYDECK_LAT_LON_LAYER_KWARGS[viz_type],
-                mutable_structure=True,
-                key=st.session_state.deck_options_key[viz_type],
+def pydeck_lat_lon_viz(data: pd.DataFrame) -> str:
+
+    with st.expander("PyDeck Lat/Lon Viz"):
+        with st.form(key="geo-form-2"):
+            col4, col5 = st.columns((1, 3), gap="large")
+
+            filtered_data = date_slider_filter_data(
+                col5, data, streamlit_widget_key="slider-2"
             )
+            viz_types = ("HexagonLayer", "ScatterplotLayer")
+            viz_type = col5.selectbox(
+                "Deck Layer",
+                viz_types,
+                index=_query_param_index("deck_layer", viz_types, 0),
+                key="geo-deck-layer",
+            )
+
+            with col4:
+                layer_kwargs = deck_layer_options(viz_type)
+            st.form_submit_button("Update plot")
+
         st.pydeck_chart(
-            make_pydeck_chart(
-                df_with_lat_lon=filtered_data,
+            make_pydeck_chart_from_layer_data(
+                cached_pydeck_layer_data(
+                    filtered_data, _df_key(filtered_data), viz_type=viz_type
+                ),
                 viz_type=viz_type,
                 layer_kwargs=layer_kwargs,
             ),
             use_container_width=True,
         )
 
-    with st.expander("US State/County Choropeth"):
+    return viz_type
+
+
+def US_fips_choropleth() -> Optional[str]:
+
+    with st.expander("US State/County Choropleth"):
         st.markdown("")
         if "data_US_FIPS" not in st.session_state:
             st.warning(
                 "You need to load the US FIPS data (after loading logs) before you can visualize login attempts by US State/County - this relies on correlating IPs <-> county FIPS codes."
             )
+            return None
         else:
+            aggregation_levels = ("State", "County")
             login_aggregation_level = st.selectbox(
-                "Aggregate Login Attempts By", options=("State", "County"), index=1
+                "Aggregate Login Attempts By",
+                options=aggregation_levels,
+                index=_query_param_index("aggregate_by", aggregation_levels, 1),
+                key="fips-agg-level",
             )
             if login_aggregation_level == "State":
                 by_county = False
             elif login_aggregation_level == "County":
                 by_county = True
             st.plotly_chart(
-                make_US_fips_choropleth_plot(
-                    df_us=st.session_state.data_US_FIPS, by_county=by_county
+                cached_US_fips_choropleth_plot(
+                    st.session_state.data_US_FIPS,
+                    _US_fips_df_key(st.session_state.data_US_FIPS),
+                    by_county=by_county,
                 ),
                 use_container_width=True,
             )
 
+            return login_aggregation_level
+
+
+def data_app(data):
+    query_params = dict(
+        projection=global_choropleth(data),
+        deck_layer=pydeck_lat_lon_viz(data),
+        aggregate_by=US_fips_choropleth(),
+    )
+
+    # keep the URL in sync with the controls, so the page can be bookmarked / shared
+    st.experimental_set_query_params(
+        **{name: value for name, value in query_params.items() if value is not None}
+    )
+
 
 run_data_app(data_app=data_app)
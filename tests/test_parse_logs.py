@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pandas as pd
+
+from ssh_analysis.process_auth_logs import (
+    _read_log,
+    df_from_parsed_logs,
+    parse_logs,
+    parse_logs_to_df,
+)
+
+AUTH_LOG_PATH = Path(__file__).parents[1] / "data" / "auth.log"
+
+
+def test_parse_logs_to_df_matches_protobuf_path():
+    # parse_logs_to_df builds the frame straight from the regex matches, skipping the protobuf
+    # round trip, so it has to stay in sync with the SSHLogs -> dataframe path
+    pd.testing.assert_frame_equal(
+        parse_logs_to_df(logfile_path=AUTH_LOG_PATH),
+        df_from_parsed_logs(parse_logs(logfile_path=AUTH_LOG_PATH)),
+    )
+
+
+def test_read_log_closes_the_map():
+    # a log left mapped would SIGBUS the process if it's truncated / rewritten while mapped
+    with _read_log(logfile_path=AUTH_LOG_PATH) as buf:
+        assert buf.find(b"password") != -1
+
+    assert buf.closed
@@ -0,0 +1,59 @@
+import pytest
+
+from ssh_analysis import process_auth_logs
+from ssh_analysis.process_auth_logs import (
+    IPLookupRecord,
+    _lookup_ip_record,
+    _maxminddb_reader,
+)
+
+# maxminddb is an optional speedup, so these only run when it's installed
+maxminddb = pytest.importorskip("maxminddb")
+
+IP_ADDRESS = "8.8.8.8"
+
+
+@pytest.fixture(autouse=True)
+def clear_geoip_caches():
+    _maxminddb_reader.cache_clear()
+    _lookup_ip_record.cache_clear()
+    yield
+    _maxminddb_reader.cache_clear()
+    _lookup_ip_record.cache_clear()
+
+
+@pytest.fixture
+def python_geoip_record(monkeypatch) -> IPLookupRecord:
+    with monkeypatch.context() as m:
+        m.setattr(process_auth_logs, "maxminddb", None)
+        record = _lookup_ip_record(IP_ADDRESS)
+
+    _maxminddb_reader.cache_clear()
+    _lookup_ip_record.cache_clear()
+
+    return record
+
+
+def test_lookup_without_maxminddb_extension(monkeypatch, python_geoip_record):
+    # e.g. a pure python maxminddb wheel / sdist built without libmaxminddb
+    monkeypatch.setattr(maxminddb, "_extension", None)
+
+    assert isinstance(_maxminddb_reader(), maxminddb.Reader)
+    assert _lookup_ip_record(IP_ADDRESS) == python_geoip_record
+
+
+def test_lookup_falls_back_to_python_geoip(monkeypatch, python_geoip_record):
+    def open_database(*args, **kwargs):
+        raise ValueError(
+            "MODE_MMAP_EXT requires the maxminddb.extension module to be available"
+        )
+
+    monkeypatch.setattr(maxminddb, "open_database", open_database)
+
+    assert _maxminddb_reader() is None
+    assert _lookup_ip_record(IP_ADDRESS) == python_geoip_record
+
+
+def test_lookup_records_match(python_geoip_record):
+    assert python_geoip_record.country_iso_code == "US"
+    assert _lookup_ip_record(IP_ADDRESS) == python_geoip_record